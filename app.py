@@ -30,15 +30,60 @@
 #   la pregunta esté visible.
 # ==========================================================================================
 
-import re
+import os
 import json
 import uuid
+import hashlib
 from io import BytesIO
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 import streamlit as st
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+try:
+    import orjson  # opcional: (de)serialización JSON más rápida del proyecto
+except ImportError:
+    orjson = None
+
+# Streamlit re-ejecuta app.py como un __main__ nuevo en cada rerun; los módulos importados se
+# evalúan una sola vez por proceso, así que textos y helpers con caché (lru_cache) viven fuera.
+from utilidades import slugify_name, asegurar_nombre_unico, choice_pairs, xlsform_or_expr, xlsform_not
+from textos import (
+    TIPOS,
+    INTRO_POLICIAL_2026,
+    P3_TEXTO_SUPERIOR,
+    P3_TITULO,
+    P3_INTRO,
+    P4_TITULO,
+    P4_INTRO,
+    P5_TITULO,
+    P5_INTRO,
+    NOTA_Q7,
+    NOTA_Q8,
+    NOTA_Q10,
+    NOTA_Q101,
+    NOTA_Q11,
+    NOTA_Q111,
+    NOTA_Q12,
+    NOTA_Q121,
+    NOTA_Q13,
+    NOTA_Q131,
+    NOTA_Q16,
+    NOTA_Q161,
+    NOTA_Q17,
+    NOTA_Q18,
+    CONSENTIMIENTO_TITULO,
+    CONSENTIMIENTO_BLOQUES,
+    NOTA_ACLARATORIA_Q5,
+    NOTA_ACLARATORIA_Q51,
+    NOTA_ASEO_Q14,
+    NOTA_ORNATO_Q15,
+)
 
 # ------------------------------------------------------------------------------------------
 # Configuración de la app
@@ -60,16 +105,6 @@ Crea tu cuestionario y **exporta un XLSForm** listo para **ArcGIS Survey123**. I
 # ------------------------------------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------------------------------------
-TIPOS = [
-    "Texto (corto)",
-    "Párrafo (texto largo)",
-    "Número",
-    "Selección única",
-    "Selección múltiple",
-    "Fecha",
-    "Hora",
-    "GPS (ubicación)",
-]
 
 
 def _rerun():
@@ -79,86 +114,122 @@ def _rerun():
         st.experimental_rerun()
 
 
-def slugify_name(texto: str) -> str:
-    if not texto:
-        return "campo"
-    t = texto.lower()
-    t = re.sub(r"[áàäâ]", "a", t)
-    t = re.sub(r"[éèëê]", "e", t)
-    t = re.sub(r"[íìïî]", "i", t)
-    t = re.sub(r"[óòöô]", "o", t)
-    t = re.sub(r"[úùüû]", "u", t)
-    t = re.sub(r"ñ", "n", t)
-    t = re.sub(r"[^a-z0-9]+", "_", t).strip("_")
-    return t or "campo"
+def build_option_index(preguntas: List[Dict]) -> Dict[str, Tuple[Tuple[str, str], ...]]:
+    """
+    Índice name de pregunta → pares (name, label) de sus opciones; se calcula una vez por construcción.
+    """
+    return {q["name"]: choice_pairs(tuple(q["opciones"])) for q in preguntas if q.get("opciones")}
 
 
-def asegurar_nombre_unico(base: str, usados: set) -> str:
-    if base not in usados:
-        return base
-    i = 2
-    while f"{base}_{i}" in usados:
-        i += 1
-    return f"{base}_{i}"
+# tipo_ui → (type XLSForm, appearance por defecto); los select_* se completan con su lista
+_TIPOS_SIMPLES: Dict[str, Tuple[str, Optional[str]]] = {
+    "Texto (corto)": ("text", None),
+    "Párrafo (texto largo)": ("text", "multiline"),
+    "Número": ("integer", None),
+    "Fecha": ("date", None),
+    "Hora": ("time", None),
+    "GPS (ubicación)": ("geopoint", None),
+}
+_TIPOS_SELECT: Dict[str, str] = {
+    "Selección única": "select_one",
+    "Selección múltiple": "select_multiple",
+}
 
 
 def map_tipo_to_xlsform(tipo_ui: str, name: str):
-    if tipo_ui == "Texto (corto)":
-        return ("text", None, None)
-    if tipo_ui == "Párrafo (texto largo)":
-        return ("text", "multiline", None)
-    if tipo_ui == "Número":
-        return ("integer", None, None)
-    if tipo_ui == "Selección única":
-        return (f"select_one list_{name}", None, f"list_{name}")
-    if tipo_ui == "Selección múltiple":
-        return (f"select_multiple list_{name}", None, f"list_{name}")
-    if tipo_ui == "Fecha":
-        return ("date", None, None)
-    if tipo_ui == "Hora":
-        return ("time", None, None)
-    if tipo_ui == "GPS (ubicación)":
-        return ("geopoint", None, None)
-    return ("text", None, None)
-
-
-def xlsform_or_expr(conds):
-    if not conds:
-        return None
-    if len(conds) == 1:
-        return conds[0]
-    return "(" + " or ".join(conds) + ")"
-
-
-def xlsform_not(expr):
-    if not expr:
-        return None
-    return f"not({expr})"
+    select = _TIPOS_SELECT.get(tipo_ui)
+    if select:
+        return (f"{select} list_{name}", None, f"list_{name}")
+    x_type, app = _TIPOS_SIMPLES.get(tipo_ui, ("text", None))
+    return (x_type, app, None)
 
 
-def build_relevant_expr(rules_for_target: List[Dict]):
-    or_parts = []
-    for r in rules_for_target:
-        src = r["src"]
-        op = r.get("op", "=")
-        vals = r.get("values", [])
-        if not vals:
-            continue
-
-        if op == "=":
-            segs = [f"${{{src}}}='{v}'" for v in vals]
-        elif op == "selected":
-            segs = [f"selected(${{{src}}}, '{v}')" for v in vals]
-        elif op == "!=":
-            segs = [f"${{{src}}}!='{v}'" for v in vals]
-        else:
-            segs = [f"${{{src}}}='{v}'" for v in vals]
+def _regla_expr(src: str, op: str, vals: List) -> str:
+    """
+    Segmento OR de una sola regla (src, op, valores), unido sobre un generador sin lista intermedia.
+    """
+    # Prefijo/sufijo fijos por regla: cada segmento es solo una concatenación (str(v): un JSON
+    # importado puede traer valores numéricos)
+    if op == "selected":
+        pref, suf = f"selected(${{{src}}}, '", "')"
+    elif op == "!=":
+        pref, suf = f"${{{src}}}!='", "'"
+    else:
+        pref, suf = f"${{{src}}}='", "'"
+    segs = (pref + str(v) + suf for v in vals)
+
+    if len(vals) == 1:
+        return next(segs)
+    return "(" + " or ".join(segs) + ")"
 
-        or_parts.append(xlsform_or_expr(segs))
 
+def build_relevant_expr(rules_for_target: List[Dict]):
+    or_parts = [
+        _regla_expr(r["src"], r.get("op", "="), vals)
+        for r in rules_for_target
+        if (vals := r.get("values"))
+    ]
     return xlsform_or_expr(or_parts)
 
 
+def agrupar_reglas_por_target(reglas_vis: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Agrupa las reglas de visibilidad por pregunta destino en una sola pasada (O(R)),
+    para que cada consulta por pregunta sea un lookup en lugar de recorrer todas las reglas.
+    """
+    vis_by_target: Dict[str, List[Dict]] = {}
+    for r in reglas_vis:
+        vis_by_target.setdefault(r["target"], []).append(
+            {"src": r["src"], "op": r.get("op", "="), "values": r.get("values", [])}
+        )
+    return vis_by_target
+
+
+@dataclass(slots=True)
+class Pregunta:
+    """
+    Registro liviano (slots) de una pregunta para construir el XLSForm: acceso por atributo
+    en lugar de q.get(...) repetidos sobre el dict guardado en session_state.
+    """
+
+    name: str
+    label: str
+    tipo_ui: str
+    required: bool = False
+    appearance: Optional[str] = None
+    choice_filter: Optional[str] = None
+    relevant: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, q: Dict) -> "Pregunta":
+        return cls(
+            name=q["name"],
+            label=q["label"],
+            tipo_ui=q["tipo_ui"],
+            required=bool(q.get("required")),
+            appearance=q.get("appearance") or None,
+            choice_filter=q.get("choice_filter") or None,
+            relevant=q.get("relevant") or None,
+        )
+
+
+def proyecto_a_json(proj: Dict) -> bytes:
+    """
+    Serializa el proyecto a JSON (UTF-8, indentado). Usa orjson si está instalado,
+    que devuelve bytes directamente; si no, cae a la librería estándar.
+    """
+    if orjson is not None:
+        return orjson.dumps(proj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(proj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def proyecto_desde_json(raw: bytes) -> Dict:
+    """Parsea el JSON de un proyecto (bytes) con orjson o, en su defecto, la librería estándar."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
 # ------------------------------------------------------------------------------------------
 # FIX REFLEJO DE EDICIÓN: ID estable por pregunta (qid) + editor por qid
 # ------------------------------------------------------------------------------------------
@@ -175,6 +246,31 @@ def q_index_by_qid(qid: str) -> int:
     return -1
 
 
+# Callbacks (on_click) de la lista: se ejecutan antes del rerun que dispara el clic, así
+# el cambio se ve en esa misma ejecución sin un segundo st.rerun().
+def _cb_mover_pregunta(qid: str, delta: int):
+    preguntas = st.session_state.preguntas
+    i = q_index_by_qid(qid)
+    j = i + delta
+    if i < 0 or not 0 <= j < len(preguntas):
+        return
+    preguntas[i], preguntas[j] = preguntas[j], preguntas[i]
+
+
+def _cb_editar_pregunta(qid: str):
+    st.session_state.edit_qid = qid
+
+
+def _cb_eliminar_pregunta(qid: str):
+    i = q_index_by_qid(qid)
+    if i < 0:
+        return
+    if st.session_state.edit_qid == qid:
+        st.session_state.edit_qid = None
+    del st.session_state.preguntas[i]
+    st.toast("Pregunta eliminada.")
+
+
 # ------------------------------------------------------------------------------------------
 # Estado base (session_state)
 # ------------------------------------------------------------------------------------------
@@ -198,9 +294,14 @@ with col_logo:
     up_logo = st.file_uploader("Logo (PNG/JPG)", type=["png", "jpg", "jpeg"], key="uploader_logo")
     if up_logo:
         st.image(up_logo, caption="Logo cargado", use_container_width=True)
-        st.session_state["_logo_bytes"] = up_logo.getvalue()
-        st.session_state["_logo_name"] = up_logo.name
+        # Solo se copian los bytes cuando cambia el archivo subido (no en cada rerun)
+        logo_id = getattr(up_logo, "file_id", None) or (up_logo.name, up_logo.size)
+        if st.session_state.get("_logo_file_id") != logo_id:
+            st.session_state["_logo_file_id"] = logo_id
+            st.session_state["_logo_bytes"] = up_logo.getvalue()
+            st.session_state["_logo_name"] = up_logo.name
     else:
+        st.session_state["_logo_file_id"] = None
         try:
             st.image(DEFAULT_LOGO_PATH, caption="Logo (001.png)", use_container_width=True)
             st.session_state["_logo_bytes"] = None
@@ -219,7 +320,8 @@ with col_txt:
         help="Debe coincidir con el archivo en media/ de Survey123 Connect.",
         key="logo_media_txt",
     )
-    titulo_compuesto = (f"Encuesta policial – {delegacion.strip()}" if delegacion.strip() else "Encuesta policial")
+    _deleg = delegacion.strip()
+    titulo_compuesto = f"Encuesta policial – {_deleg}" if _deleg else "Encuesta policial"
     st.markdown(f"<h5 style='text-align:center;margin:4px 0'>📋 {titulo_compuesto}</h5>", unsafe_allow_html=True)
 
 
@@ -235,138 +337,13 @@ def _get_logo_media_name():
 
 
 # ------------------------------------------------------------------------------------------
-# Textos base (Intro / Consentimiento / Intros de páginas)
+# Textos base (Intro / Consentimiento / Intros de páginas): ver textos.py
 # ------------------------------------------------------------------------------------------
-INTRO_POLICIAL_2026 = (
-    "Esta encuesta busca recopilar información desde la experiencia del personal de la Fuerza Pública para apoyar la "
-    "planificación preventiva y la mejora del servicio policial."
-)
-
-# --- TEXTOS INFORMATIVOS por página (según imágenes) ---
-P3_TEXTO_SUPERIOR = (
-    "Esta encuesta tiene como propósito recopilar información desde la experiencia operativa del personal de la Fuerza Pública, "
-    "con el fin de fortalecer el análisis institucional, la planificación preventiva y la mejora continua del servicio policial. "
-    "Las respuestas se basan en la experiencia profesional dentro de la jurisdicción y en el entorno institucional de la delegación."
-)
-P3_TITULO = "Datos generales de carácter estadístico y funcional"
-P3_INTRO = (
-    "Este apartado recopila información general de carácter funcional y demográfico con fines exclusivamente estadísticos y analíticos. "
-    "No se solicita información que permita la identificación individual del personal participante."
-)
-
-P4_TITULO = "Contexto territorial y problemáticas de interés operativo"
-P4_INTRO = (
-    "En este apartado se recopila información desde la experiencia territorial del personal policial sobre personas o estructuras criminales "
-    "y problemáticas de interés en la jurisdicción. La información tiene carácter descriptivo y preventivo, orientada al análisis estratégico "
-    "institucional, sin sustituir los mecanismos formales de denuncia o investigación."
-)
-
-P5_TITULO = "Información de condiciones institucionales y operativas de la delegación"
-P5_INTRO = (
-    "Este apartado tiene como finalidad recopilar percepciones sobre condiciones internas que inciden en la prestación del servicio policial, "
-    "tales como recursos, capacitación, entorno laboral y funcionamiento operativo. La información se utiliza con fines de mejora institucional "
-    "y no constituye evaluación individual ni disciplinaria."
-)
-
-# --- NOTAS específicas por preguntas (según solicitud) ---
-NOTA_Q7 = (
-    "La información brindada tiene carácter descriptivo y se fundamenta en la experiencia operativa del personal dentro de su área de responsabilidad."
-)
-NOTA_Q8 = (
-    "La información brindada tiene carácter descriptivo y se fundamenta en la experiencia operativa del personal dentro de su área de responsabilidad."
-)
-
-NOTA_Q10 = (
-    "La respuesta se basa en la apreciación general sobre condiciones operativas de la delegación y se utiliza con fines diagnósticos institucionales."
-)
-NOTA_Q101 = (
-    "La respuesta se basa en la apreciación general sobre condiciones operativas de la delegación y se utiliza con fines diagnósticos institucionales."
-)
-
-NOTA_Q11 = (
-    "Nota: la respuesta es de selección única. La información recopilada tiene como finalidad identificar necesidades generales de fortalecimiento "
-    "profesional para la planificación institucional."
-)
-NOTA_Q111 = (
-    "La información recopilada tiene como finalidad identificar necesidades generales de fortalecimiento profesional para la planificación institucional."
-)
-
-NOTA_Q12 = (
-    "Nota: La respuesta refleja una apreciación general sobre el entorno institucional y se utiliza para análisis agregado, sin implicar valoración individual."
-)
-NOTA_Q121 = (
-    "La respuesta refleja una apreciación general sobre el entorno institucional y se utiliza para análisis agregado, sin implicar valoración individual."
-)
-
-NOTA_Q13 = (
-    "Nota: La información suministrada es confidencial y de uso institucional para fines preventivos y de mejora organizacional. "
-    "No sustituye los canales formales establecidos por la normativa disciplinaria vigente."
-)
-NOTA_Q131 = (
-    "Nota: La respuesta es abierta. La información suministrada es confidencial y de uso institucional para fines preventivos y de mejora organizacional. "
-    "No sustituye los canales formales establecidos por la normativa disciplinaria vigente."
-)
-
-NOTA_Q16 = (
-    "Nota: La respuesta es de selección única. La información suministrada será tratada bajo estricta reserva institucional y se utiliza exclusivamente "
-    "para análisis preventivo. No sustituye los mecanismos formales de denuncia establecidos por la normativa vigente."
-)
-NOTA_Q161 = (
-    "Nota: La respuesta es abierta. La información suministrada será tratada bajo estricta reserva institucional y se utiliza exclusivamente para análisis "
-    "preventivo. No sustituye los mecanismos formales de denuncia establecidos por la normativa vigente."
-)
-
-NOTA_Q17 = (
-    "Nota: El suministro de información de contacto es totalmente voluntario y no condiciona la participación en la encuesta. La respuesta es abierta."
-)
-NOTA_Q18 = (
-    "Nota: El espacio es de carácter voluntario y permite agregar información que la persona participante considere relevante desde su experiencia operativa."
-)
-
-CONSENTIMIENTO_TITULO = "Consentimiento Informado para la Participación en la Encuesta"
-CONSENT_SI = slugify_name("Sí")
-CONSENT_NO = slugify_name("No")
-
-CONSENTIMIENTO_BLOQUES = [
-    "Usted está siendo invitado(a) a participar de forma libre y voluntaria en la Encuesta Policial de Percepción Institucional 2026, dirigida al personal de la Fuerza Pública. El objetivo de esta encuesta es recopilar información de carácter preventivo, estadístico e institucional, desde la experiencia operativa del personal policial, con el fin de fortalecer el análisis estratégico, la planificación preventiva y la mejora continua del servicio policial. La participación es totalmente voluntaria. Usted puede negarse a responder cualquier pregunta, así como retirarse de la encuesta en cualquier momento, sin que ello genere consecuencia alguna.",
-    "De conformidad con lo dispuesto en el artículo 5 de la Ley N.º 8968, Ley de Protección de la Persona frente al Tratamiento de sus Datos Personales, se le informa que:",
-    "Finalidad del tratamiento: La información recopilada será utilizada exclusivamente para fines estadísticos, analíticos y preventivos, y no para investigaciones penales, procesos judiciales, sanciones administrativas ni procedimientos disciplinarios.",
-    "Datos personales: Algunos apartados permiten, de forma voluntaria, el suministro de datos personales o información de contacto.",
-    "Tratamiento de los datos: Los datos serán almacenados, analizados y resguardados bajo criterios de confidencialidad y seguridad, conforme a la normativa vigente.",
-    "Carácter confidencial del instrumento: El instrumento no es anónimo. La información será tratada bajo criterios de estricta confidencialidad institucional y utilizada exclusivamente para análisis estadístico consolidado, sin individualización del personal participante.",
-    "Destinatarios y acceso: La información será conocida únicamente por el personal autorizado de la Fuerza Pública / Ministerio de Seguridad Pública, para los fines indicados. No será cedida a terceros ajenos a estos fines.",
-    "Responsable de la base de datos: El Ministerio de Seguridad Pública, a través de la Dirección de Programas Policiales Preventivos, Oficina Estrategia Integral de Prevención para la Seguridad Pública (EIPSEP / Estrategia Sembremos Seguridad) será el responsable del tratamiento y custodia de la información recolectada.",
-    "Derechos de la persona participante: Usted conserva el derecho a la autodeterminación informativa y a decidir libremente sobre el suministro de sus datos.",
-    "Las respuestas brindadas no constituyen denuncias formales, ni sustituyen los mecanismos legales correspondientes.",
-    "Al continuar con la encuesta, usted manifiesta haber leído y comprendido la información anterior y otorga su consentimiento informado para participar.",
-]
-
-# NOTAS ACLARATORIAS (P3)
-NOTA_ACLARATORIA_Q5 = (
-    "Nota aclaratoria: La pregunta sobre la clase policial que desempeña se utiliza únicamente para organizar la información "
-    "según el rol operativo desde el cual se responde el instrumento. No constituye identificación personal ni individualización "
-    "del funcionario, y su tratamiento se enmarca en el deber de confidencialidad y manejo responsable de la información institucional, "
-    "conforme a la Ley N.° 8968 y a los principios que rigen el ejercicio de la función pública."
-)
-
-NOTA_ACLARATORIA_Q51 = (
-    "Nota aclaratoria: La pregunta sobre la función principal desempeñada se utiliza únicamente para organizar la información "
-    "según el rol operativo desde el cual se responde el instrumento. No implica identificación personal y su tratamiento se realiza "
-    "conforme al deber de confidencialidad establecido en la Ley N.° 8968 y a los principios que rigen el ejercicio de la función pública."
-)
-
-# NOTAS NUEVAS (P5: 14 y 15)
-NOTA_ASEO_Q14 = (
-    "Nota: Esta pregunta registra la presencia y frecuencia de condiciones de aseo observadas en las instalaciones internas de la delegación durante el desarrollo ordinario del servicio. "
-    "La respuesta se basa en la observación cotidiana del entorno de trabajo y tiene carácter descriptivo, constituyendo un insumo para análisis institucional agregado, "
-    "sin implicar evaluación administrativa ni disciplinaria."
-)
-
-NOTA_ORNATO_Q15 = (
-    "Nota: Esta pregunta registra la presencia y frecuencia de condiciones de desorden o deterioro observadas en los espacios físicos externos de la delegación "
-    "(patios, jardines, frente o parte posterior) durante el servicio ordinario. La respuesta se fundamenta en la observación directa del entorno institucional "
-    "y tiene carácter descriptivo, constituyendo un insumo para análisis institucional agregado, sin implicar evaluación administrativa ni disciplinaria."
-)
+# Literales equivalentes a slugify_name("Sí") / slugify_name("No")
+SLUG_SI = "si"
+SLUG_NO = "no"
+# Usada por el seed y por la nota previa confidencial de P4
+REL_PRESENCIA_SI = f"${{presencia_ilicita}}='{SLUG_SI}'"
 
 # ------------------------------------------------------------------------------------------
 # Sidebar: Exportar/Importar proyecto (JSON) + Config
@@ -376,13 +353,14 @@ with st.sidebar:
 
     _ = st.text_input(
         "Título del formulario (referencia)",
-        value=(f"Encuesta policial – {delegacion.strip()}" if delegacion.strip() else "Encuesta policial"),
+        value=titulo_compuesto,
         key="sb_form_title_ref",
     )
 
     idioma = st.selectbox("Idioma por defecto (default_language)", options=["es", "en"], index=0, key="sb_idioma")
 
-    version_auto = datetime.now().strftime("%Y%m%d%H%M")
+    # La versión por defecto se fija una vez por sesión, no en cada rerun
+    version_auto = st.session_state.setdefault("_version_auto", datetime.now().strftime("%Y%m%d%H%M"))
     version = st.text_input("Versión (settings.version)", value=version_auto, key="sb_version")
 
     st.markdown("---")
@@ -399,7 +377,7 @@ with st.sidebar:
             "reglas_finalizar": st.session_state.reglas_finalizar,
             "delegacion": delegacion,
         }
-        jbuf = BytesIO(json.dumps(proj, ensure_ascii=False, indent=2).encode("utf-8"))
+        jbuf = BytesIO(proyecto_a_json(proj))
         st.download_button(
             "Descargar JSON",
             data=jbuf,
@@ -411,8 +389,7 @@ with st.sidebar:
     up = col_imp.file_uploader("Importar JSON", type=["json"], label_visibility="collapsed", key="uploader_json")
     if up is not None:
         try:
-            raw = up.read().decode("utf-8")
-            data = json.loads(raw)
+            data = proyecto_desde_json(up.read())
             preguntas = list(data.get("preguntas", []))
             st.session_state.preguntas = [ensure_qid(q) for q in preguntas]
             st.session_state.reglas_visibilidad = list(data.get("reglas_visibilidad", []))
@@ -425,21 +402,26 @@ with st.sidebar:
 # ------------------------------------------------------------------------------------------
 # Precarga (seed) — POLICIAL (Fuerza Pública)
 # ------------------------------------------------------------------------------------------
-def _add_if_missing(q: Dict):
-    nm = q.get("name")
-    if not nm:
-        return
-    exists = any(qq.get("name") == nm for qq in st.session_state.preguntas)
-    if not exists:
-        st.session_state.preguntas.append(ensure_qid(q))
-
-
 if "seed_cargado_policial" not in st.session_state:
-    SLUG_SI = slugify_name("Sí")
-    SLUG_NO = slugify_name("No")
+    # Expresiones relevant solo del seed: Streamlit re-ejecuta el script en cada interacción,
+    # así que se arman aquí (una vez por sesión) y no a nivel de módulo.
+    REL_FUNCION_OTRA = f"${{funcion_principal}}='{slugify_name('Otra función')}'"
+    REL_ACTIVIDADES_OTRO = (
+        f"{REL_PRESENCIA_SI} and selected(${{actividades_delictivas_identificadas}}, '{slugify_name('Otro')}')"
+    )
+    REL_CONDICIONES_NO = f"${{condiciones_basicas_ok}}='{SLUG_NO}'"
+    REL_CAPACITACION_SI = f"${{falta_capacitacion}}='{SLUG_SI}'"
+    REL_MOTIVACION_BAJA = xlsform_or_expr(
+        [
+            f"${{entorno_motivacion}}='{slugify_name('Poco')}'",
+            f"${{entorno_motivacion}}='{slugify_name('Nada')}'",
+        ]
+    )
+    REL_SITUACIONES_SI = f"${{situaciones_internas}}='{SLUG_SI}'"
+    REL_OFICIALES_SI = f"${{oficiales_relacion_crimen}}='{SLUG_SI}'"
 
-    # Consentimiento
-    _add_if_missing(
+    seed: List[Dict] = [
+        # Consentimiento
         {
             "tipo_ui": "Selección única",
             "label": "¿Acepta participar en esta encuesta?",
@@ -449,11 +431,9 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "horizontal",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
+        },
 
-    # ---------------- P3 DATOS GENERALES (1–5.1) ----------------
-    _add_if_missing(
+        # ---------------- P3 DATOS GENERALES (1–5.1) ----------------
         {
             "tipo_ui": "Número",
             "label": "1. Años de servicio:",
@@ -463,9 +443,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Selección única",
             "label": "2. Edad (en años cumplidos): marque la categoría que incluya su edad.",
@@ -475,9 +453,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Selección única",
             "label": "3. ¿Con cuál de estas opciones se identifica?",
@@ -487,9 +463,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Selección única",
             "label": "4. Escolaridad:",
@@ -508,9 +482,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Selección única",
             "label": "5. ¿Cuál es la clase policial que desempeña en su delegación?",
@@ -529,10 +501,8 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    # 5.1
-    _add_if_missing(
+        },
+        # 5.1
         {
             "tipo_ui": "Selección única",
             "label": "5.1. ¿Cuál es la función principal que desempeña actualmente en la delegación?",
@@ -554,9 +524,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Texto (corto)",
             "label": "Indique cuál es esa otra función:",
@@ -565,12 +533,10 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": None,
             "choice_filter": None,
-            "relevant": f"${{funcion_principal}}='{slugify_name('Otra función')}'",
-        }
-    )
+            "relevant": REL_FUNCION_OTRA,
+        },
 
-    # ---------------- P4 CONTEXTO TERRITORIAL / INTERÉS OPERATIVO (6–8 + 6.1–6.4) ----------------
-    _add_if_missing(
+        # ---------------- P4 CONTEXTO TERRITORIAL / INTERÉS OPERATIVO (6–8 + 6.1–6.4) ----------------
         {
             "tipo_ui": "Selección única",
             "label": "6. ¿Tiene conocimiento sobre la presencia de personas, grupos u organizaciones que desarrollan actividades ilícitas en su jurisdicción?",
@@ -580,12 +546,8 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "horizontal",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
+        },
 
-    rel6_si = f"${{presencia_ilicita}}='{SLUG_SI}'"
-
-    _add_if_missing(
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "6.1 En caso afirmativo, indique si alguna de estas estructuras es conocida públicamente por un nombre o denominación general:",
@@ -594,10 +556,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": rel6_si,
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_PRESENCIA_SI,
+        },
         {
             "tipo_ui": "Selección múltiple",
             "label": "6.2 En caso afirmativo, ¿qué tipo de actividades delictivas identifica que desarrollan estas personas, grupos u organizaciones en su jurisdicción?",
@@ -627,10 +587,8 @@ if "seed_cargado_policial" not in st.session_state:
             ],
             "appearance": "columns",
             "choice_filter": None,
-            "relevant": rel6_si,
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_PRESENCIA_SI,
+        },
         {
             "tipo_ui": "Texto (corto)",
             "label": "Indique cuál es ese otro tipo de actividad delictiva:",
@@ -639,10 +597,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": None,
             "choice_filter": None,
-            "relevant": f"{rel6_si} and selected(${{actividades_delictivas_identificadas}}, '{slugify_name('Otro')}')",
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_ACTIVIDADES_OTRO,
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "6.3 Indique quién o quiénes se dedican a estos actos criminales. (nombres, apellidos, alias, lugar o domicilio)",
@@ -651,10 +607,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": rel6_si,
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_PRESENCIA_SI,
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "6.4 Modo de operar de esta estructura criminal (por ejemplo: venta de droga exprés o en vía pública, asalto a mano armada, modo de desplazamiento, etc.)",
@@ -663,10 +617,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": rel6_si,
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_PRESENCIA_SI,
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "7. Indique el lugar, sector o zona que, según su experiencia policial, presenta mayores condiciones de inseguridad dentro de su área de responsabilidad.",
@@ -676,9 +628,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "multiline",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "8. Describa las principales situaciones o condiciones de riesgo que inciden en la inseguridad de esa zona.",
@@ -688,11 +638,9 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "multiline",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
+        },
 
-    # ---------------- P5 CONDICIONES INSTITUCIONALES / OPERATIVAS (9–18) ----------------
-    _add_if_missing(
+        # ---------------- P5 CONDICIONES INSTITUCIONALES / OPERATIVAS (9–18) ----------------
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "9. Desde su experiencia operativa, indique qué recursos considera necesarios para fortalecer la labor policial en su delegación.",
@@ -702,9 +650,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "multiline",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Selección única",
             "label": "10. ¿Considera que las condiciones actuales de su delegación permiten cubrir adecuadamente sus necesidades básicas para el servicio (descanso, alimentación, recurso móvil, entre otros)?",
@@ -714,9 +660,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "horizontal",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "10.1 ¿Cuáles condiciones considera que se pueden mejorar?",
@@ -725,10 +669,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": f"${{condiciones_basicas_ok}}='{SLUG_NO}'",
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_CONDICIONES_NO,
+        },
         {
             "tipo_ui": "Selección única",
             "label": "11. ¿Considera usted que hace falta capacitación para el personal en su delegación policial?",
@@ -738,9 +680,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "horizontal",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "11.1 Especifique en qué áreas necesita capacitación.",
@@ -749,10 +689,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": f"${{falta_capacitacion}}='{SLUG_SI}'",
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_CAPACITACION_SI,
+        },
         {
             "tipo_ui": "Selección única",
             "label": "12. ¿En qué medida considera que la institución genera un entorno que favorece su motivación para la atención a la ciudadanía?",
@@ -762,9 +700,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "12.1 De manera general, indique por qué lo considera así.",
@@ -773,15 +709,8 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": xlsform_or_expr(
-                [
-                    f"${{entorno_motivacion}}='{slugify_name('Poco')}'",
-                    f"${{entorno_motivacion}}='{slugify_name('Nada')}'",
-                ]
-            ),
-        }
-    )
-    _add_if_missing(
+            "relevant": REL_MOTIVACION_BAJA,
+        },
         {
             "tipo_ui": "Selección única",
             "label": "13. ¿Tiene usted conocimiento de situaciones internas que, según su criterio, afectan el adecuado funcionamiento operativo o el servicio a la ciudadanía en su delegación?",
@@ -791,9 +720,7 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "horizontal",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    _add_if_missing(
+        },
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "13.1 Describa, de manera general, las situaciones a las que se refiere, relacionadas con aspectos operativos, administrativos o de servicio.",
@@ -802,12 +729,10 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": f"${{situaciones_internas}}='{SLUG_SI}'",
-        }
-    )
+            "relevant": REL_SITUACIONES_SI,
+        },
 
-    # ✅ NUEVA 14 (aseo)
-    _add_if_missing(
+        # ✅ NUEVA 14 (aseo)
         {
             "tipo_ui": "Selección única",
             "label": "14. Condiciones de aseo en instalaciones internas de la delegación. Durante el desarrollo del servicio, ¿ha observado condiciones de aseo inadecuadas en las instalaciones internas de la delegación policial?",
@@ -822,11 +747,9 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
+        },
 
-    # ✅ NUEVA 15 (ornato)
-    _add_if_missing(
+        # ✅ NUEVA 15 (ornato)
         {
             "tipo_ui": "Selección única",
             "label": "15. Condiciones de ornato en el entorno inmediato de la delegación. Durante el desarrollo del servicio, ¿ha observado condiciones de desorden o deterioro en el entorno inmediato de la delegación policial?",
@@ -841,11 +764,9 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": None,
             "choice_filter": None,
             "relevant": None,
-        }
-    )
+        },
 
-    # (ANTES 14) → ahora 16
-    _add_if_missing(
+        # (ANTES 14) → ahora 16
         {
             "tipo_ui": "Selección única",
             "label": "16. ¿Conoce oficiales de Fuerza Pública que se relacionen con alguna estructura criminal o cometan algún delito?",
@@ -855,10 +776,8 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "horizontal",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    # (ANTES 14.1) → ahora 16.1
-    _add_if_missing(
+        },
+        # (ANTES 14.1) → ahora 16.1
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "16.1 Describa la situación de la cual tiene conocimiento. (aporte nombre de la estructura, tipo de actividad, nombre de oficiales, función del oficial dentro de la organización, alias, etc.)",
@@ -867,11 +786,9 @@ if "seed_cargado_policial" not in st.session_state:
             "opciones": [],
             "appearance": "multiline",
             "choice_filter": None,
-            "relevant": f"${{oficiales_relacion_crimen}}='{SLUG_SI}'",
-        }
-    )
-    # (ANTES 15) → ahora 17
-    _add_if_missing(
+            "relevant": REL_OFICIALES_SI,
+        },
+        # (ANTES 15) → ahora 17
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "17. Desea, de manera voluntaria, dejar un medio de contacto para brindar más información (correo electrónico, número de teléfono, etc.)",
@@ -881,10 +798,8 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "multiline",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
-    # (ANTES 16) → ahora 18
-    _add_if_missing(
+        },
+        # (ANTES 16) → ahora 18
         {
             "tipo_ui": "Párrafo (texto largo)",
             "label": "18. En el siguiente espacio podrá registrar alguna otra información que estime pertinente.",
@@ -894,9 +809,18 @@ if "seed_cargado_policial" not in st.session_state:
             "appearance": "multiline",
             "choice_filter": None,
             "relevant": None,
-        }
-    )
+        },
+    ]
 
+    # Solo se agregan las que falten (por name) y con un único extend sobre session_state
+    usados_seed = {qq.get("name") for qq in st.session_state.preguntas}
+    nuevas: List[Dict] = []
+    for sq in seed:
+        nm = sq.get("name")
+        if nm and nm not in usados_seed:
+            usados_seed.add(nm)
+            nuevas.append(ensure_qid(sq))
+    st.session_state.preguntas.extend(nuevas)
     st.session_state.seed_cargado_policial = True
 
 # Asegurar qid en todo
@@ -922,7 +846,7 @@ with st.form("form_add_q", clear_on_submit=False):
         st.markdown("**Opciones (una por línea)**")
         txt_opts = st.text_area("Opciones", height=120, key="add_opts")
         if txt_opts.strip():
-            opciones = [o.strip() for o in txt_opts.splitlines() if o.strip()]
+            opciones = [opt for o in txt_opts.splitlines() if (opt := o.strip())]
 
     add = st.form_submit_button("➕ Agregar pregunta")
 
@@ -978,59 +902,46 @@ else:
             if q["tipo_ui"] in ("Selección única", "Selección múltiple"):
                 c1.caption("Opciones: " + ", ".join(q.get("opciones") or []))
 
-            up_btn = c2.button("⬆️ Subir", key=f"up_{qid}", use_container_width=True, disabled=(idx == 0))
-            down_btn = c3.button(
+            c2.button(
+                "⬆️ Subir",
+                key=f"up_{qid}",
+                use_container_width=True,
+                disabled=(idx == 0),
+                on_click=_cb_mover_pregunta,
+                args=(qid, -1),
+            )
+            c3.button(
                 "⬇️ Bajar",
                 key=f"down_{qid}",
                 use_container_width=True,
                 disabled=(idx == len(st.session_state.preguntas) - 1),
+                on_click=_cb_mover_pregunta,
+                args=(qid, 1),
+            )
+            c4.button("✏️ Editar", key=f"edit_{qid}", use_container_width=True, on_click=_cb_editar_pregunta, args=(qid,))
+            c5.button(
+                "🗑️ Eliminar", key=f"del_{qid}", use_container_width=True, on_click=_cb_eliminar_pregunta, args=(qid,)
             )
-            edit_btn = c4.button("✏️ Editar", key=f"edit_{qid}", use_container_width=True)
-            del_btn = c5.button("🗑️ Eliminar", key=f"del_{qid}", use_container_width=True)
-
-            if up_btn:
-                st.session_state.preguntas[idx - 1], st.session_state.preguntas[idx] = (
-                    st.session_state.preguntas[idx],
-                    st.session_state.preguntas[idx - 1],
-                )
-                _rerun()
-
-            if down_btn:
-                st.session_state.preguntas[idx + 1], st.session_state.preguntas[idx] = (
-                    st.session_state.preguntas[idx],
-                    st.session_state.preguntas[idx + 1],
-                )
-                _rerun()
-
-            if edit_btn:
-                st.session_state.edit_qid = qid
-                _rerun()
-
-            if del_btn:
-                if st.session_state.edit_qid == qid:
-                    st.session_state.edit_qid = None
-                del st.session_state.preguntas[idx]
-                st.warning("Pregunta eliminada.")
-                _rerun()
 
             if st.session_state.edit_qid == qid:
                 st.markdown("**Editar esta pregunta**")
 
-                ne_label = st.text_input("Etiqueta", value=q["label"], key=f"e_label_{qid}")
-                ne_name = st.text_input("Nombre interno (name)", value=q["name"], key=f"e_name_{qid}")
-                ne_required = st.checkbox("Requerida", value=q["required"], key=f"e_req_{qid}")
-                ne_appearance = st.text_input("Appearance", value=q.get("appearance") or "", key=f"e_app_{qid}")
-                ne_choice_filter = st.text_input("choice_filter (opcional)", value=q.get("choice_filter") or "", key=f"e_cf_{qid}")
-                ne_relevant = st.text_input("relevant (opcional)", value=q.get("relevant") or "", key=f"e_rel_{qid}")
+                with st.form(f"form_edit_{qid}", clear_on_submit=False):
+                    ne_label = st.text_input("Etiqueta", value=q["label"], key=f"e_label_{qid}")
+                    ne_name = st.text_input("Nombre interno (name)", value=q["name"], key=f"e_name_{qid}")
+                    ne_required = st.checkbox("Requerida", value=q["required"], key=f"e_req_{qid}")
+                    ne_appearance = st.text_input("Appearance", value=q.get("appearance") or "", key=f"e_app_{qid}")
+                    ne_choice_filter = st.text_input("choice_filter (opcional)", value=q.get("choice_filter") or "", key=f"e_cf_{qid}")
+                    ne_relevant = st.text_input("relevant (opcional)", value=q.get("relevant") or "", key=f"e_rel_{qid}")
 
-                ne_opciones = q.get("opciones") or []
-                if q["tipo_ui"] in ("Selección única", "Selección múltiple"):
-                    ne_opts_txt = st.text_area("Opciones (una por línea)", value="\n".join(ne_opciones), key=f"e_opts_{qid}")
-                    ne_opciones = [o.strip() for o in ne_opts_txt.splitlines() if o.strip()]
+                    ne_opciones = q.get("opciones") or []
+                    if q["tipo_ui"] in ("Selección única", "Selección múltiple"):
+                        ne_opts_txt = st.text_area("Opciones (una por línea)", value="\n".join(ne_opciones), key=f"e_opts_{qid}")
+                        ne_opciones = [opt for o in ne_opts_txt.splitlines() if (opt := o.strip())]
 
-                col_ok, col_cancel = st.columns(2)
+                    guardar = st.form_submit_button("💾 Guardar cambios", use_container_width=True)
 
-                if col_ok.button("💾 Guardar cambios", key=f"e_save_{qid}", use_container_width=True):
+                if guardar:
                     cur_idx = q_index_by_qid(qid)
                     if cur_idx == -1:
                         st.error("No se encontró la pregunta (posible cambio de estado). Intenta de nuevo.")
@@ -1055,22 +966,47 @@ else:
                     st.session_state.edit_qid = None
                     _rerun()
 
-                if col_cancel.button("Cancelar", key=f"e_cancel_{qid}", use_container_width=True):
+                if st.button("Cancelar", key=f"e_cancel_{qid}", use_container_width=True):
                     st.session_state.edit_qid = None
                     _rerun()
 
 # ------------------------------------------------------------------------------------------
 # Condicionales (panel) — opcional adicional (mantiene funcionalidad)
 # ------------------------------------------------------------------------------------------
+def _editor_eliminar_reglas(reglas: List[Dict], descripciones: List[str], key: str):
+    """
+    Lista de reglas en un único st.data_editor (columna 'Eliminar') + un solo botón para borrar
+    las marcadas, en lugar de un botón por regla.
+    """
+    df_reglas = pd.DataFrame({"Eliminar": [False] * len(reglas), "Regla": descripciones})
+    editado = st.data_editor(
+        df_reglas,
+        key=key,
+        hide_index=True,
+        use_container_width=True,
+        disabled=["Regla"],
+        column_config={"Eliminar": st.column_config.CheckboxColumn("Eliminar", width="small")},
+    )
+    marcadas = {i for i, m in enumerate(editado["Eliminar"].tolist()) if m}
+    if st.button("🗑️ Eliminar reglas marcadas", key=f"{key}_btn", disabled=not marcadas):
+        reglas[:] = [r for i, r in enumerate(reglas) if i not in marcadas]
+        # Las ediciones del editor se indexan por fila: se descartan tras borrar
+        st.session_state.pop(key, None)
+        _rerun()
+
+
 st.subheader("🔀 Condicionales (mostrar / finalizar)")
 
 if not st.session_state.preguntas:
     st.info("Agrega preguntas para definir condicionales.")
 else:
+    # Compartidos por ambos paneles (se calculan una sola vez por rerun)
+    names = [q["name"] for q in st.session_state.preguntas]
+    labels_by_name = {q["name"]: q["label"] for q in st.session_state.preguntas}
+    by_name = {q["name"]: (i, q) for i, q in enumerate(st.session_state.preguntas)}
+
     # Mostrar
     with st.expander("👁️ Mostrar pregunta si se cumple condición", expanded=False):
-        names = [q["name"] for q in st.session_state.preguntas]
-        labels_by_name = {q["name"]: q["label"] for q in st.session_state.preguntas}
 
         target = st.selectbox(
             "Pregunta a mostrar (target)",
@@ -1086,7 +1022,7 @@ else:
         )
         op = st.selectbox("Operador", options=["=", "selected"], key="vis_op")
 
-        src_q = next((qq for qq in st.session_state.preguntas if qq["name"] == src), None)
+        src_q = by_name[src][1] if src in by_name else None
         vals = []
         if src_q and src_q.get("opciones"):
             vals = st.multiselect("Valores (usa texto, internamente se usará slug)", options=src_q["opciones"], key="vis_vals")
@@ -1107,16 +1043,14 @@ else:
 
         if st.session_state.reglas_visibilidad:
             st.markdown("**Reglas de visibilidad actuales:**")
-            for i, r in enumerate(st.session_state.reglas_visibilidad):
-                st.write(f"- Mostrar **{r['target']}** si **{r['src']}** {r['op']} {r['values']}")
-                if st.button(f"Eliminar regla #{i+1}", key=f"del_vis_{i}"):
-                    del st.session_state.reglas_visibilidad[i]
-                    _rerun()
+            _editor_eliminar_reglas(
+                st.session_state.reglas_visibilidad,
+                [f"Mostrar {r['target']} si {r['src']} {r['op']} {r['values']}" for r in st.session_state.reglas_visibilidad],
+                key="vis_editor",
+            )
 
     # Finalizar
     with st.expander("⏹️ Finalizar temprano si se cumple condición", expanded=False):
-        names = [q["name"] for q in st.session_state.preguntas]
-        labels_by_name = {q["name"]: q["label"] for q in st.session_state.preguntas}
 
         src2 = st.selectbox(
             "Condición basada en",
@@ -1126,7 +1060,7 @@ else:
         )
         op2 = st.selectbox("Operador", options=["=", "selected", "!="], key="final_op")
 
-        src2_q = next((qq for qq in st.session_state.preguntas if qq["name"] == src2), None)
+        src2_q = by_name[src2][1] if src2 in by_name else None
         vals2 = []
         if src2_q and src2_q.get("opciones"):
             vals2 = st.multiselect("Valores (slug interno)", options=src2_q["opciones"], key="final_vals")
@@ -1139,23 +1073,25 @@ else:
             if not vals2:
                 st.error("Indica al menos un valor.")
             else:
-                idx_src = next((i for i, qq in enumerate(st.session_state.preguntas) if qq["name"] == src2), 0)
+                idx_src = by_name[src2][0] if src2 in by_name else 0
                 st.session_state.reglas_finalizar.append({"src": src2, "op": op2, "values": vals2, "index_src": idx_src})
                 st.success("Regla agregada.")
                 _rerun()
 
         if st.session_state.reglas_finalizar:
             st.markdown("**Reglas de finalización actuales:**")
-            for i, r in enumerate(st.session_state.reglas_finalizar):
-                st.write(f"- Si **{r['src']}** {r['op']} {r['values']} ⇒ ocultar lo que sigue (efecto fin)")
-                if st.button(f"Eliminar regla fin #{i+1}", key=f"del_fin_{i}"):
-                    del st.session_state.reglas_finalizar[i]
-                    _rerun()
+            _editor_eliminar_reglas(
+                st.session_state.reglas_finalizar,
+                [f"Si {r['src']} {r['op']} {r['values']} ⇒ ocultar lo que sigue (efecto fin)" for r in st.session_state.reglas_finalizar],
+                key="fin_editor",
+            )
 
 # ------------------------------------------------------------------------------------------
 # Construcción XLSForm
 # ------------------------------------------------------------------------------------------
-def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reglas_vis, reglas_fin):
+def _construir_xlsform(
+    preguntas, form_title: str, idioma: str, version: str, reglas_vis, reglas_fin, logo_media_name: str
+):
     survey_rows = []
     choices_rows = []
     choices_keys = set()
@@ -1166,13 +1102,10 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
             choices_rows.append(row)
             choices_keys.add(key)
 
+    option_index = build_option_index(preguntas)
     idx_by_name = {q.get("name"): i for i, q in enumerate(preguntas)}
 
-    vis_by_target = {}
-    for r in reglas_vis:
-        vis_by_target.setdefault(r["target"], []).append(
-            {"src": r["src"], "op": r.get("op", "="), "values": r.get("values", [])}
-        )
+    vis_by_target = agrupar_reglas_por_target(reglas_vis)
 
     fin_conds = []
     for r in reglas_fin:
@@ -1180,39 +1113,58 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         if cond:
             fin_conds.append((r["index_src"], cond))
 
-    def add_q(q, idx) -> Optional[str]:
+    # relevant de "finalizar" por índice de pregunta: prefijo acumulado de not(cond) con idx_src < idx.
+    # Se calcula una vez (O(N + F)) en lugar de re-filtrar fin_conds por cada pregunta.
+    fin_conds.sort(key=lambda fc: fc[0])
+    rel_fin_by_idx: List[Optional[str]] = []
+    nots_acc: List[str] = []
+    rel_fin_actual = None
+    ptr = 0
+    for i in range(len(preguntas)):
+        n_prev = len(nots_acc)
+        while ptr < len(fin_conds) and fin_conds[ptr][0] < i:
+            nots_acc.append(xlsform_not(fin_conds[ptr][1]))
+            ptr += 1
+        if len(nots_acc) != n_prev:
+            rel_fin_actual = "(" + " and ".join(nots_acc) + ")"
+        rel_fin_by_idx.append(rel_fin_actual)
+
+    rel_panel_by_name = {name: build_relevant_expr(rules) for name, rules in vis_by_target.items()}
+
+    def add_q(q: Pregunta, idx) -> Optional[str]:
         """
         Agrega la pregunta al survey y devuelve el relevant FINAL aplicado a la pregunta.
         Esto se usa para que las notas 'after' hereden el mismo relevant de la pregunta.
         """
-        x_type, default_app, list_name = map_tipo_to_xlsform(q["tipo_ui"], q["name"])
-
-        rel_manual = q.get("relevant") or None
-        rel_panel = build_relevant_expr(vis_by_target.get(q["name"], []))
+        x_type, default_app, list_name = map_tipo_to_xlsform(q.tipo_ui, q.name)
 
-        nots = [xlsform_not(cond) for idx_src, cond in fin_conds if idx_src < idx]
-        rel_fin = "(" + " and ".join(nots) + ")" if nots else None
+        rel_manual = q.relevant
+        rel_panel = rel_panel_by_name.get(q.name)
+        rel_fin = rel_fin_by_idx[idx]
 
-        parts = [p for p in [rel_manual, rel_panel, rel_fin] if p]
-        rel_final = parts[0] if parts and len(parts) == 1 else ("(" + ") and (".join(parts) + ")" if parts else None)
+        parts = [p for p in (rel_manual, rel_panel, rel_fin) if p]
+        if len(parts) > 1:
+            rel_final = "(" + ") and (".join(parts) + ")"
+        else:
+            rel_final = parts[0] if parts else None
 
-        row = {"type": x_type, "name": q["name"], "label": q["label"]}
+        row = {"type": x_type, "name": q.name, "label": q.label}
 
-        if q.get("required"):
+        if q.required:
             row["required"] = "yes"
 
-        app = q.get("appearance") or default_app
+        app = q.appearance or default_app
         if app:
             row["appearance"] = app
 
-        if q.get("choice_filter"):
-            row["choice_filter"] = q["choice_filter"]
+        if q.choice_filter:
+            row["choice_filter"] = q.choice_filter
 
         if rel_final:
             row["relevant"] = rel_final
 
         # Restricción para años de servicio (0–50)
-        if q.get("name") == "anios_servicio":
+        if q.name == "anios_servicio":
             row["constraint"] = ". >= 0 and . <= 50"
             row["constraint_message"] = "Ingrese un valor entre 0 y 50."
 
@@ -1220,12 +1172,8 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
 
         # Choices
         if list_name:
-            usados = set()
-            for opt_label in (q.get("opciones") or []):
-                base = slugify_name(opt_label)
-                opt_name = asegurar_nombre_unico(base, usados)
-                usados.add(opt_name)
-                _choices_add_unique({"list_name": list_name, "name": opt_name, "label": str(opt_label)})
+            for opt_name, opt_label in option_index.get(q.name, ()):
+                _choices_add_unique({"list_name": list_name, "name": opt_name, "label": opt_label})
 
         return rel_final
 
@@ -1234,7 +1182,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     # --------------------------------------------------------------------------------------
     survey_rows += [
         {"type": "begin_group", "name": "p1_intro", "label": "Introducción", "appearance": "field-list"},
-        {"type": "note", "name": "intro_logo", "label": form_title, "media::image": _get_logo_media_name()},
+        {"type": "note", "name": "intro_logo", "label": form_title, "media::image": logo_media_name},
         {"type": "note", "name": "intro_texto", "label": INTRO_POLICIAL_2026},
         {"type": "end_group", "name": "p1_end"},
     ]
@@ -1253,7 +1201,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         survey_rows.append({"type": "note", "name": f"cons_b{i:02d}", "label": txt})
 
     if idx_consent is not None:
-        add_q(preguntas[idx_consent], idx_consent)
+        add_q(Pregunta.from_dict(preguntas[idx_consent]), idx_consent)
 
     survey_rows.append({"type": "end_group", "name": "p2_consentimiento_end"})
 
@@ -1264,7 +1212,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
             "name": "p_fin_no",
             "label": "Finalización",
             "appearance": "field-list",
-            "relevant": f"${{consentimiento}}='{CONSENT_NO}'",
+            "relevant": f"${{consentimiento}}='{SLUG_NO}'",
         }
     )
     survey_rows.append(
@@ -1273,12 +1221,12 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     survey_rows.append({"type": "end_group", "name": "p_fin_no_end"})
 
     # Desde aquí, todo SOLO si consentimiento = Sí
-    rel_si = f"${{consentimiento}}='{CONSENT_SI}'"
+    rel_si = f"${{consentimiento}}='{SLUG_SI}'"
 
     # --------------------------------------------------------------------------------------
     # Sets por página
     # --------------------------------------------------------------------------------------
-    p_datos_generales = {
+    p_datos_generales = frozenset({
         "anios_servicio",
         "edad_rango",
         "genero",
@@ -1286,9 +1234,9 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         "clase_policial",
         "funcion_principal",
         "funcion_principal_otro",
-    }
+    })
 
-    p_interes_policial = {
+    p_interes_policial = frozenset({
         "presencia_ilicita",
         "estructura_nombre_publico",
         "actividades_delictivas_identificadas",
@@ -1297,9 +1245,9 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         "modo_operar_estructura",
         "zona_mayor_inseguridad",
         "condiciones_riesgo_zona",
-    }
+    })
 
-    p_interes_interno = {
+    p_interes_interno = frozenset({
         "recursos_necesarios",
         "condiciones_basicas_ok",
         "condiciones_mejorar",
@@ -1315,7 +1263,20 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         "desc_oficiales_relacion",
         "contacto_voluntario",
         "info_adicional",
+    })
+
+    # Una sola pasada: reparte (índice global, pregunta) por página, conservando el orden.
+    # Solo se convierten a Pregunta las que van en alguna página (el resto se ignora, como antes).
+    page_of = {
+        **{n: "p3" for n in p_datos_generales},
+        **{n: "p4" for n in p_interes_policial},
+        **{n: "p5" for n in p_interes_interno},
     }
+    page_buckets: Dict[str, List[Tuple[int, Pregunta]]] = {"p3": [], "p4": [], "p5": []}
+    for i, qq in enumerate(preguntas):
+        b = page_of.get(qq.get("name"))
+        if b:
+            page_buckets[b].append((i, Pregunta.from_dict(qq)))
 
     # --------------------------------------------------------------------------------------
     # Helper páginas
@@ -1323,7 +1284,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     def add_page(
         group_name,
         page_label,
-        names_set,
+        page_questions: List[Tuple[int, Pregunta]],
         group_appearance: str = "field-list",
         group_relevant: str = None,
         extra_notes: List[Dict] = None,
@@ -1343,23 +1304,22 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
 
         per_question_notes = per_question_notes or {}
 
-        for i, qq in enumerate(preguntas):
-            if qq["name"] in names_set:
-                rel_q = add_q(qq, i)  # ✅ relevant FINAL de la pregunta
+        for i, qq in page_questions:
+            rel_q = add_q(qq, i)  # ✅ relevant FINAL de la pregunta
 
-                notes_after = per_question_notes.get(qq["name"], [])
-                for n in notes_after:
-                    nrow = dict(n)
+            notes_after = per_question_notes.get(qq.name, [])
+            for n in notes_after:
+                nrow = dict(n)
 
-                    # ✅ Si la nota no trae relevant explícito, hereda el relevant de la pregunta.
-                    #    Si la pregunta no tiene relevant, cae al group_relevant (si existe).
-                    if "relevant" not in nrow or not str(nrow.get("relevant") or "").strip():
-                        if rel_q:
-                            nrow["relevant"] = rel_q
-                        elif group_relevant:
-                            nrow["relevant"] = group_relevant
+                # ✅ Si la nota no trae relevant explícito, hereda el relevant de la pregunta.
+                #    Si la pregunta no tiene relevant, cae al group_relevant (si existe).
+                if "relevant" not in nrow or not str(nrow.get("relevant") or "").strip():
+                    if rel_q:
+                        nrow["relevant"] = rel_q
+                    elif group_relevant:
+                        nrow["relevant"] = group_relevant
 
-                    survey_rows.append(nrow)
+                survey_rows.append(nrow)
 
         survey_rows.append({"type": "end_group", "name": f"{group_name}_end"})
 
@@ -1380,7 +1340,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     add_page(
         "p3_datos_generales",
         "Datos generales",
-        p_datos_generales,
+        page_buckets["p3"],
         group_appearance="field-list",
         group_relevant=rel_si,
         extra_notes=extra_notes_p3,
@@ -1397,7 +1357,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         "type": "note",
         "name": "nota_previa_confidencial",
         "label": "Nota previa: La información solicitada en los siguientes apartados es de carácter confidencial, para uso institucional y análisis preventivo. No constituye denuncia formal.",
-        "relevant": f"{rel_si} and ${{presencia_ilicita}}='{slugify_name('Sí')}'",
+        "relevant": f"{rel_si} and {REL_PRESENCIA_SI}",
     }
 
     extra_notes_p4 = [
@@ -1414,7 +1374,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     add_page(
         "p4_interes_policial",
         "Interés operativo",
-        p_interes_policial,
+        page_buckets["p4"],
         group_appearance="field-list",
         group_relevant=rel_si,
         extra_notes=extra_notes_p4,
@@ -1451,7 +1411,7 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     add_page(
         "p5_interes_interno",
         "Condiciones institucionales",
-        p_interes_interno,
+        page_buckets["p5"],
         group_appearance="field-list",
         group_relevant=rel_si,
         extra_notes=extra_notes_p5,
@@ -1461,7 +1421,10 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     # --------------------------------------------------------------------------------------
     # DataFrames
     # --------------------------------------------------------------------------------------
-    survey_cols_all = set().union(*[r.keys() for r in survey_rows])
+    survey_cols_all = {}
+    for r in survey_rows:
+        for k in r:
+            survey_cols_all.setdefault(k, None)
     survey_cols = [
         c
         for c in [
@@ -1478,20 +1441,16 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
         ]
         if c in survey_cols_all
     ]
-    for k in sorted(survey_cols_all):
-        if k not in survey_cols:
-            survey_cols.append(k)
+    # Columnas adicionales en orden de aparición (determinista, sin ordenar)
+    survey_cols.extend(k for k in survey_cols_all if k not in survey_cols)
 
     df_survey = pd.DataFrame(survey_rows, columns=survey_cols)
 
-    choices_cols_all = set()
+    choices_cols_all = dict.fromkeys(["list_name", "name", "label"])
     for r in choices_rows:
-        choices_cols_all.update(r.keys())
-
-    base_choice_cols = ["list_name", "name", "label"]
-    for extra in sorted(choices_cols_all):
-        if extra not in base_choice_cols:
-            base_choice_cols.append(extra)
+        for k in r:
+            choices_cols_all.setdefault(k, None)
+    base_choice_cols = list(choices_cols_all)
 
     df_choices = pd.DataFrame(choices_rows, columns=base_choice_cols) if choices_rows else pd.DataFrame(columns=base_choice_cols)
 
@@ -1510,6 +1469,47 @@ def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reg
     return df_survey, df_choices, df_settings
 
 
+def _huella_contenido(*objs) -> str:
+    """Digest blake2b (128 bits) de una serialización JSON estable (claves ordenadas) de `objs`."""
+    if orjson is not None:
+        raw = orjson.dumps(objs, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        raw = json.dumps(objs, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _construir_xlsform_cached(
+    huella: str,
+    form_title: str,
+    idioma: str,
+    version: str,
+    logo_media_name: str,
+    _preguntas,
+    _reglas_vis,
+    _reglas_fin,
+):
+    # Los parámetros con "_" no se hashean: la llave de caché es `huella` (+ textos de settings)
+    return _construir_xlsform(_preguntas, form_title, idioma, version, _reglas_vis, _reglas_fin, logo_media_name)
+
+
+def construir_xlsform(preguntas, form_title: str, idioma: str, version: str, reglas_vis, reglas_fin):
+    """
+    Construye (survey, choices, settings). La llave de st.cache_data es un digest del contenido de
+    preguntas y reglas: si nada cambió entre reruns, se devuelven los DataFrames memorizados.
+    """
+    return _construir_xlsform_cached(
+        _huella_contenido(preguntas, reglas_vis, reglas_fin),
+        form_title,
+        idioma,
+        version,
+        _get_logo_media_name(),
+        preguntas,
+        reglas_vis,
+        reglas_fin,
+    )
+
+
 # ------------------------------------------------------------------------------------------
 # Exportar a XLSForm (Excel) + Vista previa
 # ------------------------------------------------------------------------------------------
@@ -1525,26 +1525,87 @@ df_survey, df_choices, df_settings = construir_xlsform(
     reglas_fin=st.session_state.reglas_finalizar,
 )
 
-with st.expander("👀 Vista previa (survey / choices / settings)", expanded=False):
-    st.caption("Estas son las hojas que se exportarán al XLSForm.")
+PREVIEW_MAX_FILAS = 200
+
+# st.expander ejecuta su contenido aunque esté cerrado: con el toggle, las hojas solo se
+# serializan hacia el navegador cuando el usuario pide la vista previa.
+if st.toggle("👀 Vista previa (survey / choices / settings)", value=False, key="ver_preview"):
+    st.caption(
+        f"Estas son las hojas que se exportarán al XLSForm. La vista previa muestra hasta {PREVIEW_MAX_FILAS} filas "
+        "por hoja; la descarga incluye todas."
+    )
     st.markdown("**survey**")
-    st.dataframe(df_survey, use_container_width=True, hide_index=True, height=260)
+    st.dataframe(df_survey.head(PREVIEW_MAX_FILAS), use_container_width=True, hide_index=True, height=260)
     st.markdown("**choices**")
-    st.dataframe(df_choices, use_container_width=True, hide_index=True, height=260)
+    st.dataframe(df_choices.head(PREVIEW_MAX_FILAS), use_container_width=True, hide_index=True, height=260)
     st.markdown("**settings**")
     st.dataframe(df_settings, use_container_width=True, hide_index=True, height=120)
 
 
-def _to_excel_bytes(df_survey: pd.DataFrame, df_choices: pd.DataFrame, df_settings: pd.DataFrame) -> bytes:
+# Motor de escritura del .xlsx: "openpyxl" (write-only, por defecto) o "xlsxwriter" (constant_memory)
+XLSX_ENGINE = os.environ.get("XLSFORM_XLSX_ENGINE", "openpyxl").strip().lower()
+
+_XLSX_HEADER_FONT = Font(bold=True)
+
+
+def _header_cells(ws, columns) -> List[WriteOnlyCell]:
+    cells = []
+    for c in columns:
+        cell = WriteOnlyCell(ws, value=c)
+        cell.font = _XLSX_HEADER_FONT
+        cells.append(cell)
+    return cells
+
+
+def _xlsx_filas(df: pd.DataFrame) -> List[list]:
+    # NaN → None (celda vacía); to_numpy(object).tolist() materializa las filas en C
+    return df.astype(object).where(df.notna(), None).to_numpy(dtype=object).tolist()
+
+
+def _xlsx_openpyxl(sheets) -> bytes:
+    """
+    openpyxl en modo write-only: las filas se transmiten a la hoja sin materializar una celda-objeto por valor.
+    """
+    wb = Workbook(write_only=True)
+    for sheet_name, df in sheets:
+        ws = wb.create_sheet(sheet_name)
+        ws.append(_header_cells(ws, df.columns))
+        for row in _xlsx_filas(df):
+            ws.append(row)
     output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df_survey.to_excel(writer, sheet_name="survey", index=False)
-        df_choices.to_excel(writer, sheet_name="choices", index=False)
-        df_settings.to_excel(writer, sheet_name="settings", index=False)
-    output.seek(0)
+    wb.save(output)
     return output.getvalue()
 
 
+def _xlsx_xlsxwriter(sheets) -> bytes:
+    """
+    xlsxwriter con constant_memory: cada fila se vuelca a disco al escribirse (menor pico de memoria).
+    Sin autodetección de fórmulas/URLs: las celdas del XLSForm se escriben siempre como texto.
+    """
+    import xlsxwriter
+
+    output = BytesIO()
+    wb = xlsxwriter.Workbook(
+        output, {"constant_memory": True, "strings_to_formulas": False, "strings_to_urls": False}
+    )
+    bold = wb.add_format({"bold": True})
+    for sheet_name, df in sheets:
+        ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, list(df.columns), bold)
+        for r, row in enumerate(_xlsx_filas(df), start=1):
+            ws.write_row(r, 0, row)
+    wb.close()
+    return output.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _to_excel_bytes(df_survey: pd.DataFrame, df_choices: pd.DataFrame, df_settings: pd.DataFrame) -> bytes:
+    sheets = (("survey", df_survey), ("choices", df_choices), ("settings", df_settings))
+    if XLSX_ENGINE == "xlsxwriter":
+        return _xlsx_xlsxwriter(sheets)
+    return _xlsx_openpyxl(sheets)
+
+
 xls_bytes = _to_excel_bytes(df_survey, df_choices, df_settings)
 safe_deleg = slugify_name(delegacion or "delegacion")
 file_name = f"xlsform_encuesta_policial_{safe_deleg}.xlsx"
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# ==========================================================================================
+# Textos fijos de la Encuesta POLICIAL (Fuerza Pública): tipos de pregunta, introducciones,
+# consentimiento y notas por pregunta.
+# ==========================================================================================
+
+# ------------------------------------------------------------------------------------------
+# Tipos de pregunta (UI)
+# ------------------------------------------------------------------------------------------
+TIPOS = (
+    "Texto (corto)",
+    "Párrafo (texto largo)",
+    "Número",
+    "Selección única",
+    "Selección múltiple",
+    "Fecha",
+    "Hora",
+    "GPS (ubicación)",
+)
+
+
+# ------------------------------------------------------------------------------------------
+# Textos base (Intro / Consentimiento / Intros de páginas)
+# ------------------------------------------------------------------------------------------
+INTRO_POLICIAL_2026 = (
+    "Esta encuesta busca recopilar información desde la experiencia del personal de la Fuerza Pública para apoyar la "
+    "planificación preventiva y la mejora del servicio policial."
+)
+
+# --- TEXTOS INFORMATIVOS por página (según imágenes) ---
+P3_TEXTO_SUPERIOR = (
+    "Esta encuesta tiene como propósito recopilar información desde la experiencia operativa del personal de la Fuerza Pública, "
+    "con el fin de fortalecer el análisis institucional, la planificación preventiva y la mejora continua del servicio policial. "
+    "Las respuestas se basan en la experiencia profesional dentro de la jurisdicción y en el entorno institucional de la delegación."
+)
+P3_TITULO = "Datos generales de carácter estadístico y funcional"
+P3_INTRO = (
+    "Este apartado recopila información general de carácter funcional y demográfico con fines exclusivamente estadísticos y analíticos. "
+    "No se solicita información que permita la identificación individual del personal participante."
+)
+
+P4_TITULO = "Contexto territorial y problemáticas de interés operativo"
+P4_INTRO = (
+    "En este apartado se recopila información desde la experiencia territorial del personal policial sobre personas o estructuras criminales "
+    "y problemáticas de interés en la jurisdicción. La información tiene carácter descriptivo y preventivo, orientada al análisis estratégico "
+    "institucional, sin sustituir los mecanismos formales de denuncia o investigación."
+)
+
+P5_TITULO = "Información de condiciones institucionales y operativas de la delegación"
+P5_INTRO = (
+    "Este apartado tiene como finalidad recopilar percepciones sobre condiciones internas que inciden en la prestación del servicio policial, "
+    "tales como recursos, capacitación, entorno laboral y funcionamiento operativo. La información se utiliza con fines de mejora institucional "
+    "y no constituye evaluación individual ni disciplinaria."
+)
+
+# --- NOTAS específicas por preguntas (según solicitud) ---
+NOTA_Q7 = (
+    "La información brindada tiene carácter descriptivo y se fundamenta en la experiencia operativa del personal dentro de su área de responsabilidad."
+)
+NOTA_Q8 = (
+    "La información brindada tiene carácter descriptivo y se fundamenta en la experiencia operativa del personal dentro de su área de responsabilidad."
+)
+
+NOTA_Q10 = (
+    "La respuesta se basa en la apreciación general sobre condiciones operativas de la delegación y se utiliza con fines diagnósticos institucionales."
+)
+NOTA_Q101 = (
+    "La respuesta se basa en la apreciación general sobre condiciones operativas de la delegación y se utiliza con fines diagnósticos institucionales."
+)
+
+NOTA_Q11 = (
+    "Nota: la respuesta es de selección única. La información recopilada tiene como finalidad identificar necesidades generales de fortalecimiento "
+    "profesional para la planificación institucional."
+)
+NOTA_Q111 = (
+    "La información recopilada tiene como finalidad identificar necesidades generales de fortalecimiento profesional para la planificación institucional."
+)
+
+NOTA_Q12 = (
+    "Nota: La respuesta refleja una apreciación general sobre el entorno institucional y se utiliza para análisis agregado, sin implicar valoración individual."
+)
+NOTA_Q121 = (
+    "La respuesta refleja una apreciación general sobre el entorno institucional y se utiliza para análisis agregado, sin implicar valoración individual."
+)
+
+NOTA_Q13 = (
+    "Nota: La información suministrada es confidencial y de uso institucional para fines preventivos y de mejora organizacional. "
+    "No sustituye los canales formales establecidos por la normativa disciplinaria vigente."
+)
+NOTA_Q131 = (
+    "Nota: La respuesta es abierta. La información suministrada es confidencial y de uso institucional para fines preventivos y de mejora organizacional. "
+    "No sustituye los canales formales establecidos por la normativa disciplinaria vigente."
+)
+
+NOTA_Q16 = (
+    "Nota: La respuesta es de selección única. La información suministrada será tratada bajo estricta reserva institucional y se utiliza exclusivamente "
+    "para análisis preventivo. No sustituye los mecanismos formales de denuncia establecidos por la normativa vigente."
+)
+NOTA_Q161 = (
+    "Nota: La respuesta es abierta. La información suministrada será tratada bajo estricta reserva institucional y se utiliza exclusivamente para análisis "
+    "preventivo. No sustituye los mecanismos formales de denuncia establecidos por la normativa vigente."
+)
+
+NOTA_Q17 = (
+    "Nota: El suministro de información de contacto es totalmente voluntario y no condiciona la participación en la encuesta. La respuesta es abierta."
+)
+NOTA_Q18 = (
+    "Nota: El espacio es de carácter voluntario y permite agregar información que la persona participante considere relevante desde su experiencia operativa."
+)
+
+CONSENTIMIENTO_TITULO = "Consentimiento Informado para la Participación en la Encuesta"
+CONSENTIMIENTO_BLOQUES = (
+    "Usted está siendo invitado(a) a participar de forma libre y voluntaria en la Encuesta Policial de Percepción Institucional 2026, dirigida al personal de la Fuerza Pública. El objetivo de esta encuesta es recopilar información de carácter preventivo, estadístico e institucional, desde la experiencia operativa del personal policial, con el fin de fortalecer el análisis estratégico, la planificación preventiva y la mejora continua del servicio policial. La participación es totalmente voluntaria. Usted puede negarse a responder cualquier pregunta, así como retirarse de la encuesta en cualquier momento, sin que ello genere consecuencia alguna.",
+    "De conformidad con lo dispuesto en el artículo 5 de la Ley N.º 8968, Ley de Protección de la Persona frente al Tratamiento de sus Datos Personales, se le informa que:",
+    "Finalidad del tratamiento: La información recopilada será utilizada exclusivamente para fines estadísticos, analíticos y preventivos, y no para investigaciones penales, procesos judiciales, sanciones administrativas ni procedimientos disciplinarios.",
+    "Datos personales: Algunos apartados permiten, de forma voluntaria, el suministro de datos personales o información de contacto.",
+    "Tratamiento de los datos: Los datos serán almacenados, analizados y resguardados bajo criterios de confidencialidad y seguridad, conforme a la normativa vigente.",
+    "Carácter confidencial del instrumento: El instrumento no es anónimo. La información será tratada bajo criterios de estricta confidencialidad institucional y utilizada exclusivamente para análisis estadístico consolidado, sin individualización del personal participante.",
+    "Destinatarios y acceso: La información será conocida únicamente por el personal autorizado de la Fuerza Pública / Ministerio de Seguridad Pública, para los fines indicados. No será cedida a terceros ajenos a estos fines.",
+    "Responsable de la base de datos: El Ministerio de Seguridad Pública, a través de la Dirección de Programas Policiales Preventivos, Oficina Estrategia Integral de Prevención para la Seguridad Pública (EIPSEP / Estrategia Sembremos Seguridad) será el responsable del tratamiento y custodia de la información recolectada.",
+    "Derechos de la persona participante: Usted conserva el derecho a la autodeterminación informativa y a decidir libremente sobre el suministro de sus datos.",
+    "Las respuestas brindadas no constituyen denuncias formales, ni sustituyen los mecanismos legales correspondientes.",
+    "Al continuar con la encuesta, usted manifiesta haber leído y comprendido la información anterior y otorga su consentimiento informado para participar.",
+)
+
+# NOTAS ACLARATORIAS (P3)
+NOTA_ACLARATORIA_Q5 = (
+    "Nota aclaratoria: La pregunta sobre la clase policial que desempeña se utiliza únicamente para organizar la información "
+    "según el rol operativo desde el cual se responde el instrumento. No constituye identificación personal ni individualización "
+    "del funcionario, y su tratamiento se enmarca en el deber de confidencialidad y manejo responsable de la información institucional, "
+    "conforme a la Ley N.° 8968 y a los principios que rigen el ejercicio de la función pública."
+)
+
+NOTA_ACLARATORIA_Q51 = (
+    "Nota aclaratoria: La pregunta sobre la función principal desempeñada se utiliza únicamente para organizar la información "
+    "según el rol operativo desde el cual se responde el instrumento. No implica identificación personal y su tratamiento se realiza "
+    "conforme al deber de confidencialidad establecido en la Ley N.° 8968 y a los principios que rigen el ejercicio de la función pública."
+)
+
+# NOTAS NUEVAS (P5: 14 y 15)
+NOTA_ASEO_Q14 = (
+    "Nota: Esta pregunta registra la presencia y frecuencia de condiciones de aseo observadas en las instalaciones internas de la delegación durante el desarrollo ordinario del servicio. "
+    "La respuesta se basa en la observación cotidiana del entorno de trabajo y tiene carácter descriptivo, constituyendo un insumo para análisis institucional agregado, "
+    "sin implicar evaluación administrativa ni disciplinaria."
+)
+
+NOTA_ORNATO_Q15 = (
+    "Nota: Esta pregunta registra la presencia y frecuencia de condiciones de desorden o deterioro observadas en los espacios físicos externos de la delegación "
+    "(patios, jardines, frente o parte posterior) durante el servicio ordinario. La respuesta se fundamenta en la observación directa del entorno institucional "
+    "y tiene carácter descriptivo, constituyendo un insumo para análisis institucional agregado, sin implicar evaluación administrativa ni disciplinaria."
+)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# ==========================================================================================
+# Utilidades puras de la Encuesta POLICIAL: slugs, pares de opciones y expresiones XLSForm.
+# ==========================================================================================
+
+import re
+from functools import lru_cache
+from typing import Tuple
+
+# ------------------------------------------------------------------------------------------
+# Slugs
+# ------------------------------------------------------------------------------------------
+# Tabla de acentos → ASCII (una sola pasada en C con str.translate, en lugar de un re.sub por vocal)
+_ACCENT_TBL = str.maketrans("áàäâéèëêíìïîóòöôúùüûñ", "aaaaeeeeiiiioooouuuun")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+@lru_cache(maxsize=8192)
+def slugify_name(texto: str) -> str:
+    if not texto:
+        return "campo"
+    t = texto.lower().translate(_ACCENT_TBL)
+    t = _SLUG_RE.sub("_", t).strip("_")
+    return t or "campo"
+
+
+def asegurar_nombre_unico(base: str, usados: set) -> str:
+    if base not in usados:
+        return base
+    i = 2
+    while f"{base}_{i}" in usados:
+        i += 1
+    return f"{base}_{i}"
+
+
+@lru_cache(maxsize=1024)
+def choice_pairs(options: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    """
+    (name, label) de cada opción, con names únicos dentro de la lista. Memorizado por la tupla de opciones.
+    """
+    usados = set()
+    pares = []
+    for opt_label in options:
+        opt_name = asegurar_nombre_unico(slugify_name(opt_label), usados)
+        usados.add(opt_name)
+        pares.append((opt_name, str(opt_label)))
+    return tuple(pares)
+
+
+# ------------------------------------------------------------------------------------------
+# Expresiones XLSForm
+# ------------------------------------------------------------------------------------------
+def xlsform_or_expr(conds):
+    if not conds:
+        return None
+    if len(conds) == 1:
+        return conds[0]
+    return "(" + " or ".join(conds) + ")"
+
+
+def xlsform_not(expr):
+    if not expr:
+        return None
+    return f"not({expr})"